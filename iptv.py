@@ -7,26 +7,80 @@ IPTV直播源抓取与测速工具
 版本：2.0
 """
 
-import requests
-import pandas as pd
 import re
 import os
+import sys
 import time
 import concurrent.futures
 import logging
-from typing import List, Dict, Optional, Tuple, Set, Any, Union
+from typing import List, Dict, Optional, Tuple, Set, Any, Union, Iterator
 from urllib.parse import urlparse
-from dataclasses import dataclass
+from urllib.request import getproxies
+from dataclasses import dataclass, astuple
 from pathlib import Path
 import hashlib
 import json
 import argparse
-from collections import defaultdict
+from collections import defaultdict, Counter, deque
 import threading
+import queue
+import atexit
+import bisect
+import socket
+import functools
+import heapq
+import operator
+
+# IP地址主机匹配：一次匹配同时区分IPv6字面量(v6)和IPv4地址(v4)
+HOST_PATTERN = re.compile(
+    r'^[a-z]+://(?:\[(?P<v6>[a-fA-F0-9:]+)\]|(?P<v4>(?:\d{1,3}\.){3}\d{1,3})(?=[:/?#]|$))',
+    re.IGNORECASE
+)
+
+@functools.lru_cache(maxsize=4096)
+def _extract_domain(url: str) -> str:
+    """
+    从URL提取域名（结果缓存，同一URL在日志和输出中会多次用到）
+    
+    Args:
+        url: 完整URL
+        
+    Returns:
+        str: 域名或截断的URL
+    """
+    # IP地址直接用正则提取：IPv6避免按冒号切分端口时截断地址，IPv4省去urlparse
+    if match := HOST_PATTERN.match(url):
+        return match.group('v6') or match.group('v4')
+    
+    try:
+        netloc = urlparse(url).netloc  # 解析网络位置
+        return netloc.split(':')[0]  # 移除端口号
+    except:
+        # 解析失败时返回截断的URL
+        return url[:25] + "..." if len(url) > 25 else url
+
+@functools.lru_cache(maxsize=4096)
+def _extract_hostname(url: str) -> Optional[str]:
+    """
+    从URL提取用于DNS解析的主机名（去掉用户信息和端口）
+    
+    Args:
+        url: 完整URL
+        
+    Returns:
+        Optional[str]: 主机名，URL无法解析时为None
+    """
+    try:
+        return urlparse(url).hostname
+    except ValueError:
+        return None
 
 @dataclass
 class TestResult:
     """测速结果数据类"""
+    # 显式声明槽位，去掉实例__dict__（兼容Python 3.10以下的dataclass）
+    __slots__ = ('url', 'speed', 'error', 'response_time', 'status_code', 'content_type', 'success')
+    
     url: str                    # 测试的URL地址
     speed: Optional[float]      # 测速结果(KB/s)，None表示测试失败
     error: Optional[str]        # 错误信息，成功时为None
@@ -35,22 +89,113 @@ class TestResult:
     content_type: Optional[str] # 内容类型
     success: bool              # 测试是否成功
 
+# requests导入较慢，创建工具实例时才导入（见_create_ssl_context），--help等不访问网络的调用无需加载
+requests = None
+
+def _create_ssl_context() -> Any:
+    """
+    导入requests并创建所有HTTPS连接共用的SSL上下文，CA证书只在创建时加载一次
+    
+    Returns:
+        ssl.SSLContext: SSL上下文
+    """
+    global requests
+    import ssl
+    import requests
+    return ssl.create_default_context(cafile=requests.certs.where())
+
+def _create_http_adapter(pool_connections: int, pool_maxsize: int, ssl_context: Any) -> Any:
+    """
+    创建使用共享SSL上下文的连接适配器
+    
+    Args:
+        pool_connections: 连接池缓存的主机数
+        pool_maxsize: 每个主机保持的最大连接数
+        ssl_context: 共用的SSL上下文
+        
+    Returns:
+        HTTPAdapter: 连接适配器
+    """
+    from requests.adapters import HTTPAdapter
+    
+    class SharedSSLAdapter(HTTPAdapter):
+        """共用SSL上下文的连接适配器"""
+        
+        def __init__(self, *args, **kwargs):
+            # 父类构造函数会调用init_poolmanager，需要先准备好SSL上下文
+            self.ssl_context = ssl_context
+            super().__init__(*args, **kwargs)
+        
+        def init_poolmanager(self, *args, **kwargs):
+            kwargs['ssl_context'] = self.ssl_context
+            super().init_poolmanager(*args, **kwargs)
+        
+        def cert_verify(self, conn, url, verify, cert):
+            super().cert_verify(conn, url, verify, cert)
+            if verify is True:
+                # 默认证书已加载到共享上下文中，不再让每个新连接重新读取CA文件
+                conn.ca_certs = None
+            elif hasattr(conn, 'conn_kw'):
+                # 关闭校验或自定义CA时由urllib3为连接单独创建上下文，不修改共享上下文
+                conn.conn_kw.pop('ssl_context', None)
+    
+    return SharedSSLAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=0  # 重试由工具自身控制
+    )
+
+def _is_cert_verify_error(error: BaseException) -> bool:
+    """
+    判断异常链中是否包含SSL证书校验失败
+    
+    证书问题重试也不会成功；握手中断等其他SSL错误可能是临时故障，仍需重试
+    
+    Args:
+        error: 请求抛出的异常
+        
+    Returns:
+        bool: 是否为证书校验失败
+    """
+    import ssl
+    seen = set()
+    pending = [error]
+    while pending:
+        e = pending.pop()
+        if not isinstance(e, BaseException) or id(e) in seen:
+            continue
+        seen.add(id(e))
+        if isinstance(e, ssl.SSLCertVerificationError):
+            return True
+        # requests -> urllib3 -> ssl 的异常分别通过args、reason和异常上下文包装（ssl异常的reason是字符串，入队后跳过）
+        pending.extend((e.__cause__, e.__context__, getattr(e, 'reason', None)))
+        pending.extend(e.args)
+    return False
+
 class IPTVConfig:
     """IPTV工具配置类"""
     
     def __init__(self):
         # 网络配置
         self.timeout = 10                    # 请求超时时间(秒)
-        self.max_workers = 6               # 最大并发线程数
+        self.connect_timeout = 3             # 测速建立连接超时时间(秒)，无响应的主机尽快放弃
+        self.max_workers = 16              # 最大并发线程数（所有频道共用一个线程池）
         self.test_size_kb = 1024            # 测速数据大小(KB)，增加数据量提高准确性
-        self.retry_times = 2               # 重试次数
+        self.retry_times = 2               # 数据源抓取重试次数
+        self.probe_retry_times = 1         # 测速重试次数，失败的流会占住测速线程，重试不宜多
         self.request_delay = 0.3           # 请求间延迟(秒)，避免请求过快
+        self.pool_connections = 32         # 每个线程的连接池缓存的主机数
+        self.max_probes_per_host = 4       # 同一主机同时提交到线程池的最大测速数
         
         # 测速配置
         self.min_speed_threshold = 500      # 最小速度阈值(KB/s)，低于此值的源将被丢弃
         self.max_test_per_channel = 30     # 每个频道最大测试源数
         self.keep_best_sources = 8         # 每个频道保留最佳源数量
+        self.speed_tie_tolerance = 0.1     # 速度相差在此比例内的源视为同速，按首字节延迟排序
         self.speed_test_duration = 10       # 测速最大持续时间(秒)
+        self.good_enough_speed = 1000      # 频道已有足够多源达到此速度(KB/s)时跳过其余未测源，0表示不提前结束
+        self.probe_cache_ttl = 3600        # 测速结果缓存有效期(秒)，缓存保存在cache_file中跨运行复用
+        self.dns_cache_ttl = 300           # 主机名解析结果缓存有效期(秒)，缓存保存在dns_cache_file中跨运行复用
         
         # 数据源配置 - 多个直播源URL
         self.source_urls = [
@@ -67,7 +212,9 @@ class IPTVConfig:
         # 文件路径配置
         self.base_dir = Path(__file__).parent  # 基础目录
         self.template_file = self.base_dir / "demo.txt"  # 模板文件路径
-        self.cache_file = self.base_dir / "cache.json"   # 缓存文件路径
+        self.cache_file = self.base_dir / "cache.json"   # 测速结果缓存文件路径
+        self.http_cache_file = self.base_dir / "http_cache.json"  # 数据源HTTP缓存(ETag/Last-Modified)
+        self.dns_cache_file = self.base_dir / "dns_cache.json"    # 主机名解析结果缓存
         
         # 输出文件配置
         self.output_files = {
@@ -112,28 +259,58 @@ class IPTVTool:
             config: 配置对象，如果为None则使用默认配置
         """
         self.config = config or IPTVConfig()  # 使用传入配置或默认配置
+        self.setup_logging()  # 设置日志系统，后续初始化步骤需要写日志
+        
+        # 所有HTTPS连接共用一个SSL上下文（同时完成requests的导入）
+        self.ssl_context = _create_ssl_context()
+        
+        # 每个线程使用独立会话，避免并发请求争用同一连接池的锁
+        # keep-alive连接只在线程内复用，同一主机的请求落在不同线程时各自建立连接
+        self.thread_local = threading.local()
         
-        # 请求会话配置 - 复用连接提高效率
-        self.session = requests.Session()
-        self.session.headers.update(self.config.headers)
+        # 测速请求头只依赖配置，构建一次后每次测速复用
+        # Range头让服务器只发送测速所需的数据量，identity编码让服务器不压缩，测得的是实际传输的字节数
+        self.test_size = self.config.test_size_kb * 1024  # 测速数据量(字节)
+        self.probe_headers = {'Range': f'bytes=0-{self.test_size - 1}', 'Accept-Encoding': 'identity'}
         
         # 正则表达式预编译 - 提高解析效率
-        self.ipv4_pattern = re.compile(r'^http://(\d{1,3}\.){3}\d{1,3}')  # IPv4地址匹配
-        self.ipv6_pattern = re.compile(r'^http://\[([a-fA-F0-9:]+)\]')     # IPv6地址匹配
-        self.channel_pattern = re.compile(r'^([^,#]+)')                    # 频道名称匹配
+        # 模板中的频道名称：每行去掉前导空白后、第一个逗号或#之前的部分，空行和#注释行不匹配
+        self.channel_pattern = re.compile(r'^[^\S\n]*([^,#\s][^,#\n]*)', re.MULTILINE)
         self.extinf_pattern = re.compile(r'#EXTINF:.*?,(.+)', re.IGNORECASE)  # M3U格式频道信息
-        self.tvg_name_pattern = re.compile(r'tvg-name="([^"]*)"', re.IGNORECASE)  # M3U频道名
-        self.tvg_logo_pattern = re.compile(r'tvg-logo="([^"]*)"', re.IGNORECASE)  # M3U台标
-        self.group_title_pattern = re.compile(r'group-title="([^"]*)"', re.IGNORECASE)  # M3U分组
+        self.extinf_attr_pattern = re.compile(r'([\w-]+)="([^"]*)"')           # M3U属性(tvg-name/tvg-logo/group-title等)
+        # 直播源内容特征模式，用于验证抓取内容
+        self.content_patterns = [
+            re.compile(r'http://[^\s]+', re.IGNORECASE),  # HTTP URL
+            re.compile(r'#EXTINF', re.IGNORECASE),        # M3U格式标记
+            re.compile(r',http', re.IGNORECASE),          # TXT格式分隔符
+            re.compile(r'\.m3u8?', re.IGNORECASE),        # M3U8文件
+            re.compile(r'\.ts', re.IGNORECASE)            # TS流
+        ]
+        self.txt_line_pattern = re.compile(r'^([^,]+?)\s*,\s*(http.+)$')  # TXT格式"频道名称,http://url"行
+        self.url_comment_pattern = re.compile(r'\s+#.*$')                  # URL后的"# 注释"
+        # 频道分类关键词，每个分类编译为一个正则，分类顺序即匹配优先级
+        self.category_patterns = [
+            (category, re.compile('|'.join(map(re.escape, keywords))))
+            for category, keywords in self.config.channel_categories.items()
+            if keywords
+        ]
+        # 分类配置键到显示名称（去掉",#genre#"后缀）的映射，输出时按频道查表
+        self.category_groups = {
+            category: category.replace(",#genre#", "")
+            for category in self.config.channel_categories
+        }
         
         # 状态变量
-        self.valid_channels = self.load_template_channels()  # 有效频道列表
-        self.url_cache = {}              # URL测速缓存，避免重复测速
+        self.template_order = self.load_template_channels()  # 模板频道顺序
+        self.valid_channels = frozenset(self.template_order)  # 有效频道集合（只读）
+        self.url_cache = self.load_probe_cache()  # URL测速缓存，避免重复测速
+        self.http_cache = self.load_http_cache()  # 数据源HTTP缓存，未更新的源直接复用
+        self.dns_cache = self.load_dns_cache()  # 主机名解析缓存 host -> [时间戳, 是否可解析]
+        self.category_cache = {}         # 频道分类缓存，各输出文件共用
         self.processed_count = 0         # 已处理URL计数
         self.lock = threading.Lock()     # 线程锁，用于并发安全
         
         # 初始化系统
-        self.setup_logging()    # 设置日志系统
         self.setup_directories()  # 创建必要目录
 
     def setup_logging(self):
@@ -142,10 +319,64 @@ class IPTVTool:
         for file_path in self.config.output_files.values():
             file_path.parent.mkdir(exist_ok=True)
             
-        # 初始化日志文件，写入头部信息
-        with open(self.config.output_files['log'], 'w', encoding='utf-8') as f:
-            f.write(f"IPTV Tool Process Log - {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write("="*60 + "\n")
+        # 初始化日志文件并保持打开，避免每条日志重新打开文件
+        self.log_file = open(self.config.output_files['log'], 'w', encoding='utf-8', buffering=1 << 16)
+        
+        # 写入头部信息
+        self.log_file.write(f"IPTV Tool Process Log - {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        self.log_file.write("="*60 + "\n")
+        
+        # 日志由后台线程写入文件，测速等热点路径只需入队
+        self.log_timestamp = (0, '')  # (秒级时间, 格式化时间戳)缓存
+        self.log_error_reported = False  # 日志文件写入失败是否已提示
+        self.log_queue = queue.Queue()
+        self.log_thread = threading.Thread(target=self._log_writer, daemon=True)
+        self.log_thread.start()
+        atexit.register(self.close_logging)
+
+    def _log_writer(self):
+        """后台日志写入线程，从队列中取出日志写入文件，收到None时退出"""
+        while True:
+            log_entry = self.log_queue.get()
+            try:
+                if log_entry is None:
+                    break
+                self.log_file.write(log_entry)
+            except (OSError, ValueError) as e:
+                # 写入失败时继续消费队列，否则等待日志写完的调用会一直阻塞
+                self.report_log_error(e)
+            finally:
+                self.log_queue.task_done()
+
+    def report_log_error(self, error: Exception):
+        """
+        日志文件写入失败时在标准错误输出提示，只提示一次
+        
+        Args:
+            error: 写入时发生的异常
+        """
+        if not self.log_error_reported:
+            self.log_error_reported = True
+            print(f"日志文件写入失败: {error}", file=sys.stderr)
+
+    def flush_logging(self):
+        """等待后台线程写完队列中的日志，并把缓冲内容刷新到文件"""
+        self.log_queue.join()
+        try:
+            self.log_file.flush()
+        except (OSError, ValueError) as e:
+            self.report_log_error(e)
+
+    def close_logging(self):
+        """停止后台日志线程并关闭日志文件"""
+        if self.log_file.closed:
+            return
+        self.log_queue.put(None)
+        self.log_thread.join()
+        try:
+            self.log_file.close()
+        except OSError as e:
+            self.report_log_error(e)
 
     def setup_directories(self):
         """创建必要的文件目录"""
@@ -160,12 +391,15 @@ class IPTVTool:
             level: 日志级别 (INFO, SUCCESS, WARNING, ERROR, DEBUG)
             console_print: 是否在控制台显示
         """
-        timestamp = time.strftime('%Y-%m-%d %H:%M:%S')  # 时间戳
+        # 时间戳按秒缓存，同一秒内的日志复用格式化结果
+        now = int(time.time())
+        if now != self.log_timestamp[0]:
+            self.log_timestamp = (now, time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now)))
+        timestamp = self.log_timestamp[1]
         log_entry = f"[{timestamp}] [{level}] {message}\n"
         
-        # 写入日志文件
-        with open(self.config.output_files['log'], 'a', encoding='utf-8') as f:
-            f.write(log_entry)
+        # 交给后台线程写入日志文件
+        self.log_queue.put(log_entry)
         
         # 控制台输出（带颜色）
         if console_print:
@@ -181,27 +415,26 @@ class IPTVTool:
             reset = "\033[0m"  # 重置颜色
             print(f"{color}[{level}] {message}{reset}")
 
-    def load_template_channels(self) -> Set[str]:
+    def load_template_channels(self) -> List[str]:
         """
         加载模板文件中的有效频道列表
         
         Returns:
-            Set[str]: 频道名称集合
+            List[str]: 按模板顺序排列的频道名称（已去重）
         """
-        channels = set()  # 使用集合避免重复
+        channels = []  # 保持模板顺序
         if not self.config.template_file.exists():
             self.log(f"模板文件 {self.config.template_file} 不存在，将处理所有频道", "WARNING")
             return channels
         
         try:
-            # 读取模板文件
+            # 读取整个模板文件，一次扫描提取所有频道名称
             with open(self.config.template_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()  # 去除首尾空白
-                    if line and not line.startswith('#'):  # 跳过空行和注释行
-                        if match := self.channel_pattern.match(line):
-                            channel_name = match.group(1).strip()  # 提取频道名称
-                            channels.add(channel_name)  # 添加到集合
+                content = f.read()
+            # 去除名称尾部空白后按首次出现顺序去重，名称驻留后模板顺序、频道集合和分类缓存共用同一字符串对象
+            channels = list(dict.fromkeys(
+                sys.intern(name.rstrip()) for name in self.channel_pattern.findall(content)
+            ))
             self.log(f"从模板加载频道 {len(channels)} 个", "SUCCESS")
         except Exception as e:
             self.log(f"加载模板文件错误: {str(e)}", "ERROR")
@@ -210,6 +443,126 @@ class IPTVTool:
 
     # ==================== 数据获取与处理 ====================
     
+    def load_http_cache(self) -> Dict[str, Dict[str, str]]:
+        """
+        加载数据源HTTP缓存
+        
+        Returns:
+            Dict[str, Dict[str, str]]: URL到缓存条目(etag, last_modified, content)的映射
+        """
+        if not self.config.http_cache_file.exists():
+            return {}
+        
+        try:
+            with open(self.config.http_cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            self.log(f"加载HTTP缓存失败: {str(e)}", "WARNING")
+            return {}
+
+    def save_http_cache(self):
+        """保存数据源HTTP缓存，供下次运行发送条件请求"""
+        try:
+            with open(self.config.http_cache_file, 'w', encoding='utf-8') as f:
+                json.dump(self.http_cache, f, ensure_ascii=False)
+        except Exception as e:
+            self.log(f"保存HTTP缓存失败: {str(e)}", "WARNING")
+
+    def load_probe_cache(self) -> Dict[str, Dict[str, Any]]:
+        """
+        加载测速结果缓存，丢弃已过期的条目和失败结果
+        
+        Returns:
+            Dict[str, Dict[str, Any]]: URL哈希到缓存条目(result, timestamp)的映射
+        """
+        if not self.config.cache_file.exists():
+            return {}
+        
+        try:
+            with open(self.config.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            now = time.time()
+            cache = {}
+            for key, entry in data.items():
+                result = TestResult(*entry['result'])
+                if result.success and now - entry['timestamp'] < self.config.probe_cache_ttl:
+                    cache[key] = {'result': result, 'timestamp': entry['timestamp']}
+            return cache
+        except Exception as e:
+            self.log(f"加载测速缓存失败: {str(e)}", "WARNING")
+            return {}
+
+    def save_probe_cache(self):
+        """
+        保存测速结果缓存，供下次运行复用
+        
+        只保存成功的结果：失败可能是临时的（超时、断流），下次运行应重新测试
+        """
+        data = {
+            key: {'result': astuple(entry['result']), 'timestamp': entry['timestamp']}
+            for key, entry in self.url_cache.items()
+            if entry['result'].success
+        }
+        try:
+            with open(self.config.cache_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+        except Exception as e:
+            self.log(f"保存测速缓存失败: {str(e)}", "WARNING")
+
+    def load_dns_cache(self) -> Dict[str, List[Any]]:
+        """
+        加载主机名解析缓存，丢弃已过期的条目
+        
+        Returns:
+            Dict[str, List[Any]]: 主机名到[时间戳, 是否可解析]的映射
+        """
+        if not self.config.dns_cache_file.exists():
+            return {}
+        
+        try:
+            with open(self.config.dns_cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            now = time.time()
+            return {
+                host: entry for host, entry in data.items()
+                if now - entry[0] < self.config.dns_cache_ttl
+            }
+        except Exception as e:
+            self.log(f"加载DNS缓存失败: {str(e)}", "WARNING")
+            return {}
+
+    def save_dns_cache(self):
+        """保存主机名解析缓存，短时间内重新运行时不再重复解析"""
+        try:
+            with open(self.config.dns_cache_file, 'w', encoding='utf-8') as f:
+                json.dump(self.dns_cache, f, ensure_ascii=False)
+        except Exception as e:
+            self.log(f"保存DNS缓存失败: {str(e)}", "WARNING")
+
+    def init_worker_session(self):
+        """
+        为当前线程创建独立的请求会话，同时用作线程池的初始化函数，使会话创建不计入首次测速耗时
+        
+        每个线程同一时刻只发出一个请求，连接池每个主机保留一个连接即可
+        """
+        adapter = _create_http_adapter(self.config.pool_connections, 1, self.ssl_context)
+        session = requests.Session()
+        session.headers.update(self.config.headers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        self.thread_local.session = session
+    
+    def get_session(self) -> Any:
+        """
+        获取当前线程使用的请求会话，线程池之外调用时按需创建
+        
+        Returns:
+            requests.Session: 当前线程的独立会话
+        """
+        if not hasattr(self.thread_local, 'session'):
+            self.init_worker_session()
+        return self.thread_local.session
+    
     def fetch_single_source(self, url: str) -> Tuple[str, Optional[str]]:
         """
         抓取单个源的数据
@@ -220,7 +573,7 @@ class IPTVTool:
         Returns:
             Tuple[str, Optional[str]]: (URL, 内容) 或 (URL, None) 如果失败
         """
-        self.log(f"抓取源: {self._extract_domain(url)}")
+        self.log(f"抓取源: {_extract_domain(url)}")
         
         # 重试机制
         for attempt in range(self.config.retry_times + 1):
@@ -229,23 +582,57 @@ class IPTVTool:
                 if attempt > 0:
                     time.sleep(1)
                     
+                # 带上缓存的校验信息发送条件请求，源未更新时服务器返回304
+                cached = self.http_cache.get(url)
+                headers = {}
+                if cached:
+                    if cached.get('etag'):
+                        headers['If-None-Match'] = cached['etag']
+                    if cached.get('last_modified'):
+                        headers['If-Modified-Since'] = cached['last_modified']
+                
                 # 发送HTTP请求
-                response = self.session.get(url, timeout=self.config.timeout)
+                response = self.get_session().get(url, timeout=self.config.timeout, headers=headers)
+                if response.status_code == 304 and cached:
+                    self.log(f"源未更新，使用缓存: {_extract_domain(url)}", "SUCCESS")
+                    return url, cached['content']
                 response.raise_for_status()  # 检查HTTP状态码
                 
+                # 服务器未声明编码时直接按UTF-8解码，避免requests逐字节探测编码或按ISO-8859-1解码出乱码
+                if 'charset=' not in response.headers.get('content-type', '').lower():
+                    response.encoding = 'utf-8'
+                
                 # 验证内容有效性
                 content = response.text
                 if self.validate_content(content):
-                    self.log(f"成功抓取: {self._extract_domain(url)} (大小: {len(content)} 字符)", "SUCCESS")
+                    self.log(f"成功抓取: {_extract_domain(url)} (大小: {len(content)} 字符)", "SUCCESS")
+                    
+                    # 记录校验信息和内容，供下次条件请求使用
+                    etag = response.headers.get('ETag')
+                    last_modified = response.headers.get('Last-Modified')
+                    if etag or last_modified:
+                        self.http_cache[url] = {
+                            'etag': etag or '',
+                            'last_modified': last_modified or '',
+                            'content': content
+                        }
                     return url, content
                 else:
                     raise ValueError("内容格式无效")
                     
             except Exception as e:
-                if attempt < self.config.retry_times:
-                    self.log(f"第{attempt+1}次尝试失败 {self._extract_domain(url)}: {str(e)}，重试...", "WARNING")
+                # 内容无效、URL错误、SSL证书校验失败和4xx状态（408/429除外）重试也不会成功，直接放弃
+                permanent = isinstance(e, ValueError) or _is_cert_verify_error(e) or (
+                    isinstance(e, requests.exceptions.HTTPError)
+                    and e.response is not None
+                    and 400 <= e.response.status_code < 500
+                    and e.response.status_code not in (408, 429)
+                )
+                if attempt < self.config.retry_times and not permanent:
+                    self.log(f"第{attempt+1}次尝试失败 {_extract_domain(url)}: {str(e)}，重试...", "WARNING")
                 else:
-                    self.log(f"抓取失败 {self._extract_domain(url)}: {str(e)}", "ERROR")
+                    self.log(f"抓取失败 {_extract_domain(url)}: {str(e)}", "ERROR")
+                    break
         return url, None
 
     def validate_content(self, content: str) -> bool:
@@ -261,31 +648,29 @@ class IPTVTool:
         if not content or len(content.strip()) < 10:
             return False  # 内容为空或太短
         
-        # 检查是否包含直播源特征模式
-        patterns = [
-            r'http://[^\s]+',  # HTTP URL
-            r'#EXTINF',        # M3U格式标记
-            r',http',          # TXT格式分隔符
-            r'\.m3u8?',        # M3U8文件
-            r'\.ts'            # TS流
-        ]
-        # 统计匹配的模式数量
-        valid_patterns = sum(1 for pattern in patterns if re.search(pattern, content, re.IGNORECASE))
-        return valid_patterns >= 2  # 至少匹配2个模式认为是有效内容
+        # 检查是否包含直播源特征模式，至少匹配2个模式认为是有效内容
+        valid_patterns = 0
+        for pattern in self.content_patterns:
+            if pattern.search(content):
+                valid_patterns += 1
+                if valid_patterns >= 2:  # 已满足条件，无需继续扫描剩余模式
+                    return True
+        return False
 
-    def fetch_streams(self) -> Optional[str]:
+    def fetch_streams(self) -> List[str]:
         """
         从所有源URL并发抓取直播源
         
         Returns:
-            Optional[str]: 合并后的内容，失败返回None
+            List[str]: 每个成功数据源的内容，全部失败时为空列表
         """
         contents = []  # 存储成功获取的内容
         successful_sources = 0  # 成功源计数
         
-        # 使用线程池并发抓取
+        # 使用线程池并发抓取，每个源一个线程，总耗时取决于最慢的源
         with concurrent.futures.ThreadPoolExecutor(
-            max_workers=min(3, len(self.config.source_urls))  # 限制最大线程数
+            max_workers=max(1, len(self.config.source_urls)),
+            initializer=self.init_worker_session
         ) as executor:
             # 提交所有抓取任务
             future_to_url = {
@@ -303,51 +688,53 @@ class IPTVTool:
         # 记录抓取结果
         self.log(f"成功抓取 {successful_sources}/{len(self.config.source_urls)} 个数据源", 
                 "SUCCESS" if successful_sources > 0 else "ERROR")
+        self.save_http_cache()
         
-        return "\n".join(contents) if contents else None  # 合并所有内容
+        return contents  # 各源内容分别保留，按各自格式解析
 
-    def parse_content(self, content: str) -> pd.DataFrame:
+    def parse_content(self, contents: List[str]) -> List[Tuple[str, str, str, str]]:
         """
-        解析直播源内容为DataFrame
+        解析直播源内容
         
         Args:
-            content: 直播源内容
+            contents: 各数据源的内容列表
             
         Returns:
-            pd.DataFrame: 解析后的直播源数据
+            List[Tuple[str, str, str, str]]: 解析后的(频道名称, URL, 台标, 分组)列表
         """
         streams = []  # 存储解析后的流数据
+        parsed_count = 0  # 解析到的条目总数（含模板外频道）
+        valid_channels = self.valid_channels
         
-        # 检测格式并选择相应的解析方法
-        if content.startswith("#EXTM3U"):
-            streams.extend(self._parse_m3u_content(content))  # M3U格式解析
-        else:
-            streams.extend(self._parse_txt_content(content))  # TXT格式解析
+        # 逐个数据源检测格式并选择相应的解析方法，不拼接成一个大字符串
+        for content in contents:
+            if content.startswith("#EXTM3U"):
+                entries = self._parse_m3u_content(content)  # M3U格式解析
+            else:
+                entries = self._parse_txt_content(content)  # TXT格式解析
+            
+            # 边解析边根据模板过滤，模板外的频道不进入列表
+            for entry in entries:
+                parsed_count += 1
+                if not valid_channels or entry[0] in valid_channels:
+                    streams.append(entry)
         
         # 检查是否解析到数据
-        if not streams:
+        if not parsed_count:
             self.log("未解析到任何直播源", "WARNING")
-            return pd.DataFrame(columns=['program_name', 'stream_url', 'tvg_logo', 'group_title'])
+            return []
         
-        # 创建DataFrame
-        df = pd.DataFrame(streams)
-        
-        # 过滤和去重处理
-        initial_count = len(df)
-        if self.valid_channels:
-            # 根据模板过滤频道
-            df = df[df['program_name'].isin(self.valid_channels)]
-            filtered_count = initial_count - len(df)
-            if filtered_count > 0:
-                self.log(f"根据模板过滤掉 {filtered_count} 个频道", "INFO")
+        filtered_count = parsed_count - len(streams)
+        if filtered_count > 0:
+            self.log(f"根据模板过滤掉 {filtered_count} 个频道", "INFO")
         
         # 去重处理
-        df = self.deduplicate_streams(df)
-        self.log(f"解析到 {len(df)} 个有效直播源", "SUCCESS")
+        streams = self.deduplicate_streams(streams)
+        self.log(f"解析到 {len(streams)} 个有效直播源", "SUCCESS")
         
-        return df
+        return streams
 
-    def _parse_m3u_content(self, content: str) -> List[Dict[str, str]]:
+    def _parse_m3u_content(self, content: str) -> Iterator[Tuple[str, str, str, str]]:
         """
         解析M3U格式内容
         
@@ -355,16 +742,14 @@ class IPTVTool:
             content: M3U格式内容
             
         Returns:
-            List[Dict[str, str]]: 解析后的流数据列表
+            Iterator[Tuple[str, str, str, str]]: 逐个产生解析出的(频道名称, URL, 台标, 分组)
         """
-        streams = []  # 存储解析结果
-        lines = content.splitlines()  # 按行分割
         current_program = None  # 当前节目名称
         current_logo = None     # 当前台标URL
         current_group = None    # 当前分组
         
         # 遍历所有行
-        for i, line in enumerate(lines):
+        for line in content.splitlines():
             line = line.strip()  # 去除空白
             if line.startswith("#EXTINF"):
                 # 解析EXTINF行，提取节目信息
@@ -372,34 +757,29 @@ class IPTVTool:
                 if program_name:
                     current_program = program_name.group(1).strip()
                 
+                # 一次扫描提取所有属性，同名属性以第一次出现为准
+                attrs = {}
+                for key, value in self.extinf_attr_pattern.findall(line):
+                    attrs.setdefault(key.lower(), value)
+                
                 # 优先使用tvg-name作为节目名称
-                tvg_name = self.tvg_name_pattern.search(line)
-                if tvg_name and tvg_name.group(1).strip():
-                    current_program = tvg_name.group(1).strip()
+                tvg_name = attrs.get('tvg-name', '').strip()
+                if tvg_name:
+                    current_program = tvg_name
                 
                 # 提取台标和分组信息
-                logo_match = self.tvg_logo_pattern.search(line)
-                current_logo = logo_match.group(1) if logo_match else ""
-                
-                group_match = self.group_title_pattern.search(line)
-                current_group = group_match.group(1) if group_match else ""
+                current_logo = attrs.get('tvg-logo', '')
+                current_group = attrs.get('group-title', '')
                 
-            elif line.startswith(("http://", "https://")) and current_program:
+            elif current_program and line.startswith(("http://", "https://")):
                 # 遇到URL行，与前面的EXTINF信息组合
-                streams.append({
-                    "program_name": current_program,
-                    "stream_url": line,
-                    "tvg_logo": current_logo or "",
-                    "group_title": current_group or ""
-                })
+                yield (current_program, line, current_logo or "", current_group or "")
                 # 重置当前信息
                 current_program = None
                 current_logo = None
                 current_group = None
-        
-        return streams
 
-    def _parse_txt_content(self, content: str) -> List[Dict[str, str]]:
+    def _parse_txt_content(self, content: str) -> Iterator[Tuple[str, str, str, str]]:
         """
         解析TXT格式内容
         
@@ -407,95 +787,151 @@ class IPTVTool:
             content: TXT格式内容
             
         Returns:
-            List[Dict[str, str]]: 解析后的流数据列表
+            Iterator[Tuple[str, str, str, str]]: 逐个产生解析出的(频道名称, URL, 台标, 分组)，TXT格式无台标和分组
         """
-        streams = []
-        
         # 逐行解析
-        for line_num, line in enumerate(content.splitlines(), 1):
+        for line in content.splitlines():
             line = line.strip()
             if not line or line.startswith('#'):  # 跳过空行和注释
                 continue
-                
+            
             # 匹配 "频道名称,http://url" 格式
-            if match := re.match(r"^([^,]+?)\s*,\s*(http.+)$", line):
-                program_name = match.group(1).strip()
+            if match := self.txt_line_pattern.match(line):
                 stream_url = match.group(2).strip()
-                
-                # 清理URL参数中的额外信息（如注释）
-                stream_url = re.sub(r'\s+#.*$', '', stream_url)
-                
-                streams.append({
-                    "program_name": program_name,
-                    "stream_url": stream_url,
-                    "tvg_logo": "",
-                    "group_title": ""
-                })
-        
-        return streams
+                # 清理URL后的注释，大多数行没有"#"，无需执行替换
+                if '#' in stream_url:
+                    stream_url = self.url_comment_pattern.sub('', stream_url)
+                yield (match.group(1).strip(), stream_url, "", "")
 
-    def deduplicate_streams(self, df: pd.DataFrame) -> pd.DataFrame:
+    def deduplicate_streams(self, streams: List[Tuple[str, str, str, str]]) -> List[Tuple[str, str, str, str]]:
         """
         去重直播源，优先保留M3U格式的源
         
         Args:
-            df: 原始数据DataFrame
+            streams: 原始(频道名称, URL, 台标, 分组)列表
             
         Returns:
-            pd.DataFrame: 去重后的DataFrame
+            List[Tuple[str, str, str, str]]: 去重后的直播源列表
         """
-        # 计算URL的哈希值用于去重
-        def get_url_key(url):
+        # 一次遍历按(频道名称, 基础URL)去重，有logo和group信息的源（通常是M3U格式，质量更好）单独存放
+        # 两个字典都保留首次出现的源和出现顺序，无需排序
+        preferred = {}  # 有logo或group信息的源
+        plain = {}      # 其他源
+        for stream in streams:
             # 移除参数进行基础去重，只比较基础URL
-            base_url = url.split('?')[0].split('#')[0]
-            return hashlib.md5(base_url.encode()).hexdigest()
-        
-        df['url_key'] = df['stream_url'].apply(get_url_key)
-        
-        # 优先保留有logo和group信息的源（通常是M3U格式，质量更好）
-        df['priority'] = df.apply(
-            lambda x: 2 if x['tvg_logo'] or x['group_title'] else 1, 
-            axis=1
-        )
-        
-        # 按优先级排序并去重，保留优先级高的
-        df = df.sort_values('priority', ascending=False)
-        df = df.drop_duplicates(subset=['program_name', 'url_key'], keep='first')
-        
-        # 清理临时列
-        return df.drop(['url_key', 'priority'], axis=1)
+            key = (stream[0], stream[1].split('?')[0].split('#')[0])
+            bucket = preferred if stream[2] or stream[3] else plain
+            if key not in bucket:
+                bucket[key] = stream
+        
+        # 优先源在前；普通源只保留没有对应优先源的
+        unique_streams = list(preferred.values())
+        unique_streams.extend(stream for key, stream in plain.items() if key not in preferred)
+        return unique_streams
 
-    def organize_streams(self, df: pd.DataFrame) -> pd.DataFrame:
+    def organize_streams(self, streams: List[Tuple[str, str, str, str]]) -> Dict[str, List[str]]:
         """
         整理直播源数据，按频道分组
         
         Args:
-            df: 解析后的直播源数据
+            streams: 解析后的(频道名称, URL, 台标, 分组)列表
             
         Returns:
-            pd.DataFrame: 分组整理后的数据
+            Dict[str, List[str]]: 频道名称到URL列表的映射
         """
         # 按频道名称分组，聚合所有URL
-        grouped = df.groupby('program_name')['stream_url'].apply(list).reset_index()
+        grouped = defaultdict(list)
+        for program_name, stream_url, _, _ in streams:
+            grouped[program_name].append(stream_url)
+        grouped = dict(grouped)
+        
+        if not grouped:
+            return grouped
         
         # 统计每个频道的源数量
-        source_counts = grouped['stream_url'].apply(len)
+        source_counts = [len(urls) for urls in grouped.values()]
         
         # 记录统计信息
-        self.log(f"频道源数量统计: 平均{source_counts.mean():.1f}, 最多{source_counts.max()}, 最少{source_counts.min()}", "INFO")
+        self.log(f"频道源数量统计: 平均{sum(source_counts)/len(source_counts):.1f}, 最多{max(source_counts)}, 最少{min(source_counts)}", "INFO")
         
         # 显示源数量分布详情
-        count_distribution = source_counts.value_counts().sort_index()
-        for count, freq in count_distribution.items():
-            self.log(f"  {count}个源: {freq}个频道", "DEBUG")
+        count_distribution = Counter(source_counts)
+        for count in sorted(count_distribution):
+            self.log(f"  {count}个源: {count_distribution[count]}个频道", "DEBUG")
+        
+        # 不同主机的源排在前面，并限制为测试上限的2倍（为无法解析的主机留出余量）
+        limit = self.config.max_test_per_channel * 2
+        for channel, urls in grouped.items():
+            grouped[channel] = self._diversify_hosts(urls)[:limit]
         
         return grouped
 
+    def _diversify_hosts(self, urls: List[str]) -> List[str]:
+        """
+        按主机分散排列URL，避免测试名额集中在同一个主机上
+        
+        Args:
+            urls: 同一频道的URL列表
+            
+        Returns:
+            List[str]: 每个主机的首个源在前、同主机其余源在后的URL列表
+        """
+        seen_hosts = set()
+        first_per_host = []  # 每个主机的第一个源
+        duplicates = []      # 同主机的其余源
+        for url in urls:
+            host = _extract_domain(url)
+            if host in seen_hosts:
+                duplicates.append(url)
+            else:
+                seen_hosts.add(host)
+                first_per_host.append(url)
+        return first_per_host + duplicates
+
     # ==================== 测速功能 ====================
     
+    def resolve_hosts(self, urls: List[str], executor: concurrent.futures.Executor) -> Set[str]:
+        """
+        并发解析URL中的主机名，找出无法解析的主机
+        
+        配置了代理时由代理解析主机名，本地解析失败不能说明主机不可用，此时不做检查
+        
+        Args:
+            urls: URL列表
+            executor: 执行解析的线程池
+            
+        Returns:
+            Set[str]: 无法解析的主机名集合
+        """
+        if getproxies():
+            self.log("已配置代理，跳过本地DNS预解析", "DEBUG", console_print=False)
+            return set()
+        
+        now = time.time()
+        hosts = {_extract_hostname(url) for url in urls} - {None}
+        
+        # 只解析缓存中没有或已过期的主机
+        pending = [
+            host for host in hosts
+            if host not in self.dns_cache or now - self.dns_cache[host][0] >= self.config.dns_cache_ttl
+        ]
+        
+        def is_resolvable(host: str) -> bool:
+            try:
+                return bool(socket.getaddrinfo(host, None))
+            except (OSError, UnicodeError):
+                return False
+        
+        if pending:
+            for host, resolvable in zip(pending, executor.map(is_resolvable, pending)):
+                self.dns_cache[host] = [now, resolvable]
+            self.save_dns_cache()
+        
+        return {host for host in hosts if not self.dns_cache[host][1]}
+
     def test_single_url(self, url: str) -> TestResult:
         """
-        测试单个URL的速度和质量
+        测试单个URL的速度和质量，同一URL出现在多个频道时只实际测试一次
         
         Args:
             url: 要测试的URL
@@ -503,76 +939,113 @@ class IPTVTool:
         Returns:
             TestResult: 测试结果
         """
-        start_time = time.time()  # 开始时间
+        # 检查缓存，避免重复测速
+        cache_key = hashlib.md5(url.encode()).hexdigest()
+        if cache_key in self.url_cache:
+            cached_result = self.url_cache[cache_key]
+            # 缓存在有效期内直接复用
+            if time.time() - cached_result['timestamp'] < self.config.probe_cache_ttl:
+                self.log(f"使用缓存结果: {_extract_domain(url)}", "DEBUG", console_print=False)
+                return cached_result['result']
+        
+        result = self._measure_url(url)
+        
+        # 缓存测试结果（失败结果同样缓存，本次运行内避免重复等待超时；失败结果不写入缓存文件）
+        self.url_cache[cache_key] = {
+            'result': result,
+            'timestamp': time.time()
+        }
+        
+        return result
+
+    def _measure_url(self, url: str) -> TestResult:
+        """
+        实际请求URL并测量速度
+        
+        Args:
+            url: 要测试的URL
+            
+        Returns:
+            TestResult: 测试结果
+        """
+        start_time = time.perf_counter()  # 开始时间
         
         # 重试机制
-        for attempt in range(self.config.retry_times + 1):
+        for attempt in range(self.config.probe_retry_times + 1):
             try:
                 # 添加请求延迟，避免过快请求
                 if attempt > 0:
                     time.sleep(0.5)
                 
-                # 检查缓存，避免重复测速
-                cache_key = hashlib.md5(url.encode()).hexdigest()
-                if cache_key in self.url_cache:
-                    cached_result = self.url_cache[cache_key]
-                    # 5分钟缓存有效期
-                    if time.time() - cached_result['timestamp'] < 300:
-                        self.log(f"使用缓存结果: {self._extract_domain(url)}", "DEBUG")
-                        return cached_result['result']
-                
                 # 开始测试
-                test_start = time.time()
-                with self.session.get(
+                test_size = self.test_size
+                test_start = time.perf_counter()
+                with self.get_session().get(
                     url, 
-                    timeout=self.config.timeout, 
-                    stream=True  # 流式传输，避免一次性加载大文件
+                    timeout=(min(self.config.connect_timeout, self.config.timeout), self.config.timeout),  # (连接, 读取)超时 
+                    stream=True,  # 流式传输，避免一次性加载大文件
+                    headers=self.probe_headers
                 ) as response:
-                    response_time = time.time() - test_start  # 响应时间
+                    response_time = time.perf_counter() - test_start  # 响应时间（首字节延迟）
                     
                     # 检查HTTP状态和内容类型
                     status_code = response.status_code
                     content_type = response.headers.get('content-type', '')
                     
-                    if status_code != 200:
+                    if status_code not in (200, 206):  # 206为Range部分响应
                         return TestResult(
                             url, None, f"HTTP {status_code}", 
                             response_time, status_code, content_type, False
                         )
                     
+                    # 网页响应（跳转页、错误页等）不是直播流，无需下载测速数据
+                    if content_type.startswith('text/html'):
+                        return TestResult(
+                            url, None, "非媒体内容",
+                            response_time, status_code, content_type, False
+                        )
+                    
                     # 测速：下载指定大小的数据计算速度
                     content_length = 0
                     chunk_count = 0
-                    start_download = time.time()
+                    start_download = time.perf_counter()
                     
-                    # 分块读取数据
-                    for chunk in response.iter_content(chunk_size=8192):
+                    # 直接从底层连接读取原始字节，跳过解压层
+                    # urllib3 2.x的read1返回已到达的数据而不等待读满；旧版本没有read1，按8KB分块读取
+                    # 单次读取阻塞时间有限，每次读取后都检查测速时长，慢速流不会长时间占用线程
+                    if hasattr(response.raw, 'read1'):
+                        read_chunk, max_chunk = response.raw.read1, 65536
+                    else:
+                        read_chunk, max_chunk = response.raw.read, 8192
+                    while content_length < test_size:
+                        chunk = read_chunk(min(max_chunk, test_size - content_length), decode_content=False)
+                        if not chunk:  # 数据已读完
+                            break
+                        
+                        # 首块数据是HTML文档时立即放弃，避免继续下载
+                        if chunk_count == 0 and chunk.lstrip()[:14].lower().startswith((b'<!doctype html', b'<html')):
+                            return TestResult(
+                                url, None, "非媒体内容",
+                                response_time, status_code, content_type, False
+                            )
+                        
                         content_length += len(chunk)
                         chunk_count += 1
                         
-                        # 达到测试数据量或超时则停止
-                        if (content_length >= self.config.test_size or 
-                            time.time() - start_download > self.config.speed_test_duration):
+                        # 超过测速时长则停止
+                        if time.perf_counter() - start_download > self.config.speed_test_duration:
                             break
                     
-                    download_time = time.time() - start_download
+                    download_time = time.perf_counter() - start_download
                     
                     # 计算速度（至少1KB数据才认为有效）
                     if content_length > 1024:
                         speed = content_length / download_time / 1024  # 转换为KB/s
                         
-                        result = TestResult(
+                        return TestResult(
                             url, speed, None, response_time, 
                             status_code, content_type, True
                         )
-                        
-                        # 缓存成功结果
-                        self.url_cache[cache_key] = {
-                            'result': result,
-                            'timestamp': time.time()
-                        }
-                        
-                        return result
                     else:
                         return TestResult(
                             url, 0, "数据量不足", response_time,
@@ -581,8 +1054,11 @@ class IPTVTool:
                         
             except requests.exceptions.Timeout:
                 error = "请求超时"
-            except requests.exceptions.SSLError:
-                error = "SSL证书错误"
+            except requests.exceptions.SSLError as e:
+                if _is_cert_verify_error(e):
+                    error = "SSL证书错误"
+                    break  # 证书问题重试也不会成功
+                error = "SSL连接失败"
             except requests.exceptions.ConnectionError:
                 error = "连接失败"
             except requests.exceptions.HTTPError as e:
@@ -592,48 +1068,121 @@ class IPTVTool:
         
         # 所有重试都失败
         return TestResult(
-            url, None, error, time.time() - start_time,
+            url, None, error, time.perf_counter() - start_time,
             None, None, False
         )
 
-    def test_urls_concurrently(self, urls: List[str]) -> List[TestResult]:
+    def test_urls_concurrently(self, channel_urls: Dict[str, List[str]],
+                               executor: concurrent.futures.Executor) -> Dict[str, TestResult]:
         """
-        并发测试URL列表
+        用一个线程池并发测试所有频道的URL，频道已有足够多的高速源时取消其余未开始的测试
         
         Args:
-            urls: 要测试的URL列表
+            channel_urls: 频道名称到待测URL列表的映射
+            executor: 执行测速的线程池
             
         Returns:
-            List[TestResult]: 测试结果列表
+            Dict[str, TestResult]: URL到测试结果的映射（被取消的URL不在其中）
         """
-        results = []
-        total = len(urls)
-        
-        # 使用线程池并发测试
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.config.max_workers) as executor:
-            # 提交所有测试任务
-            future_to_url = {executor.submit(self.test_single_url, url): url for url in urls}
-            
-            # 处理完成的任务并显示进度
-            for i, future in enumerate(concurrent.futures.as_completed(future_to_url), 1):
+        # 所有频道的URL去重，同一URL只测一次
+        url_channels = defaultdict(list)  # URL到所属频道的映射
+        for channel, urls in channel_urls.items():
+            for url in urls:
+                url_channels[url].append(channel)
+        
+        results = {}
+        total = len(url_channels)
+        step = max(5, total // 20)  # 进度显示间隔，约20次
+        good_counts = Counter()  # 每个频道达到good_enough_speed的源数量
+        satisfied = set()        # 已有足够高速源的频道
+        self.log(f"共 {total} 个待测源，{self.config.max_workers} 个线程并发测试", "INFO")
+        
+        # 按主机分组排队，每个主机同时最多max_probes_per_host个测试在线程池中（运行或等待）
+        # 某个测试结束后才提交同一主机的下一个URL，工作线程从不阻塞等待，慢主机只能占用有限的线程
+        host_pending = defaultdict(deque)
+        for url in url_channels:
+            host_pending[_extract_hostname(url)].append(url)
+        url_to_future = {}  # 已提交的URL到任务的映射
+        future_hosts = {}   # 未结束的任务到主机的映射
+        finished = queue.Queue()  # 结束（完成或被取消）的任务
+        
+        def submit_next(host: Optional[str]):
+            pending = host_pending[host]
+            while pending:
+                url = pending.popleft()
+                # 所属频道都已有足够高速源时不再测试
+                if all(c in satisfied for c in url_channels[url]):
+                    continue
+                future = executor.submit(self.test_single_url, url)
+                url_to_future[url] = future
+                future_hosts[future] = host
+                future.add_done_callback(finished.put)
+                return
+        
+        # 各主机轮流提交首批任务，避免同一主机的源扎堆排在队列前面
+        for _ in range(max(1, self.config.max_probes_per_host)):
+            for host in list(host_pending):
+                submit_next(host)
+        
+        # 处理结束的任务，每结束一个就补充提交同一主机的下一个URL
+        i = 0
+        while future_hosts:
+            future = finished.get()
+            host = future_hosts.pop(future)
+            if not future.cancelled():  # 被取消的任务没有结果
                 result = future.result()
-                results.append(result)
+                results[result.url] = result
+                i += 1
+                
+                # 频道已有keep_best_sources个高速源时，取消其余未开始且不被其他频道需要的测试
+                if self.config.good_enough_speed and result.success and result.speed >= self.config.good_enough_speed:
+                    for channel in url_channels[result.url]:
+                        good_counts[channel] += 1
+                        if channel in satisfied or good_counts[channel] < self.config.keep_best_sources:
+                            continue
+                        satisfied.add(channel)
+                        for url in channel_urls[channel]:
+                            if url in url_to_future and all(c in satisfied for c in url_channels[url]):
+                                url_to_future[url].cancel()
                 
                 # 更新进度（线程安全）
                 with self.lock:
                     self.processed_count += 1
-                    # 每5个或最后一个显示进度
-                    if i % 5 == 0 or i == total:
+                    # 每隔step个或最后一个显示进度
+                    if i % step == 0 or i == total:
                         self.log(f"测速进度: {i}/{total} ({i/total*100:.1f}%)", "INFO")
+            
+            submit_next(host)
         
         return results
 
-    def test_all_channels(self, grouped_streams: pd.DataFrame) -> Dict[str, List[Tuple[str, float]]]:
+    def rank_streams(self, streams: List[TestResult]) -> List[TestResult]:
+        """
+        按速度从高到低排序，与组内最快源相差不超过speed_tie_tolerance的源视为同速，组内按首字节延迟排序
+        
+        Args:
+            streams: 测试成功的结果列表
+            
+        Returns:
+            List[TestResult]: 排序后的结果列表
+        """
+        ranked = []
+        group = []  # 当前同速组，首个元素为组内最快的源
+        by_latency = operator.attrgetter('response_time')
+        for result in sorted(streams, key=operator.attrgetter('speed'), reverse=True):
+            if group and result.speed < group[0].speed * (1 - self.config.speed_tie_tolerance):
+                ranked.extend(sorted(group, key=by_latency))
+                group = []
+            group.append(result)
+        ranked.extend(sorted(group, key=by_latency))
+        return ranked
+
+    def test_all_channels(self, grouped_streams: Dict[str, List[str]]) -> Dict[str, List[Tuple[str, float]]]:
         """
         测试所有频道并保留最佳源
         
         Args:
-            grouped_streams: 分组后的直播源数据
+            grouped_streams: 频道名称到URL列表的映射
             
         Returns:
             Dict[str, List[Tuple[str, float]]]: 频道到最佳源列表的映射
@@ -647,38 +1196,58 @@ class IPTVTool:
         
         self.processed_count = 0  # 重置计数器
         
-        # 遍历所有频道
-        for idx, (_, row) in enumerate(grouped_streams.iterrows(), 1):
-            channel = row['program_name']
-            urls = row['stream_url'][:self.config.max_test_per_channel]  # 限制测试数量
+        # DNS预解析和测速共用一个线程池，整个测速阶段只创建一次
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.config.max_workers,
+            initializer=self.init_worker_session
+        ) as executor:
+            # 批量解析所有主机名，无法解析的主机直接跳过，避免逐个等待连接失败
+            dead_hosts = self.resolve_hosts([url for urls in grouped_streams.values() for url in urls], executor)
+            if dead_hosts:
+                self.log(f"{len(dead_hosts)} 个主机无法解析，跳过其直播源", "WARNING")
             
-            self.log(f"[{idx}/{total_channels}] 测试频道: {channel} ({len(urls)}个源)")
+            # 确定每个频道的待测URL
+            channel_urls = {
+                channel: [
+                    url for url in urls
+                    if _extract_hostname(url) not in dead_hosts
+                ][:self.config.max_test_per_channel]  # 限制测试数量
+                for channel, urls in grouped_streams.items()
+            }
             
-            # 并发测试该频道的所有URL
-            test_results = self.test_urls_concurrently(urls)
+            # 所有频道的URL统一提交到线程池测试
+            test_results = self.test_urls_concurrently(channel_urls, executor)
+        self.save_probe_cache()
+        
+        # 按频道汇总测试结果
+        for idx, (channel, urls) in enumerate(channel_urls.items(), 1):
+            tested = [test_results[url] for url in urls if url in test_results]
+            skipped = len(urls) - len(tested)  # 提前结束而未测试的源
+            self.log(f"[{idx}/{total_channels}] 频道: {channel} ({len(urls)}个源" +
+                     (f"，提前结束跳过{skipped}个)" if skipped else ")"))
             valid_streams = []  # 有效源列表
             
             # 处理测试结果
-            for result in test_results:
+            for result in tested:
                 # 检查是否成功且达到速度阈值
                 if result.success and result.speed and result.speed >= self.config.min_speed_threshold:
-                    valid_streams.append((result.url, result.speed))
+                    valid_streams.append(result)
                     status = "✓" if result.speed > 200 else "⚠️"  # 速度状态图标
                     speed_quality = self.get_speed_quality(result.speed)  # 速度质量评级
                     response_info = f"{result.response_time:.2f}s"  # 响应时间
-                    self.log(f"    {status} {self._extract_domain(result.url)}: {result.speed:.1f} KB/s ({speed_quality}) [{response_info}]")
+                    self.log(f"    {status} {_extract_domain(result.url)}: {result.speed:.1f} KB/s ({speed_quality}) [{response_info}]", console_print=False)
                 else:
                     error_info = result.error or "速度过低"  # 错误信息
-                    self.log(f"    ✗ {self._extract_domain(result.url)}: {error_info}")
+                    self.log(f"    ✗ {_extract_domain(result.url)}: {error_info}", console_print=False)
             
-            # 按速度排序并保留最佳源
-            valid_streams.sort(key=lambda x: x[1], reverse=True)  # 降序排序
-            results[channel] = valid_streams[:self.config.keep_best_sources]
+            # 按速度选出最佳源，速度相近的源首字节延迟低的优先
+            best_streams = self.rank_streams(valid_streams)[:self.config.keep_best_sources]
+            results[channel] = [(r.url, r.speed) for r in best_streams]
             
             # 记录频道测试结果
             if results[channel]:
                 successful_channels += 1
-                best_speed = results[channel][0][1]  # 最佳速度
+                best_speed = max(r.speed for r in best_streams)  # 最佳速度（排在首位的不一定最快）
                 self.log(f"    ✅ 最佳源: {best_speed:.1f} KB/s (保留{len(results[channel])}个)", "SUCCESS")
             else:
                 self.log("    ❌ 无有效源", "WARNING")
@@ -693,81 +1262,61 @@ class IPTVTool:
     
     def generate_output_files(self, speed_results: Dict[str, List[Tuple[str, float]]]):
         """生成所有输出文件"""
-        self.generate_txt_file(speed_results)    # 生成TXT文件
-        self.generate_m3u_file(speed_results)    # 生成M3U文件
+        channel_stats = self.generate_playlist_files(speed_results)  # 生成TXT和M3U文件，同时收集报告统计
         self.generate_json_file(speed_results)   # 生成JSON文件
-        self.generate_report(speed_results)      # 生成测速报告
+        self.generate_report(channel_stats)      # 生成测速报告
 
-    def generate_txt_file(self, results: Dict[str, List[Tuple[str, float]]]):
+    def generate_playlist_files(self, results: Dict[str, List[Tuple[str, float]]]) -> List[Tuple[str, float, int]]:
         """
-        生成TXT格式文件
+        一次遍历同时生成TXT和M3U格式文件，并收集测速报告所需的统计
         
         Args:
             results: 测速结果字典
+            
+        Returns:
+            List[Tuple[str, float, int]]: 有效频道的(频道名称, 最佳速度, 源数量)列表
         """
-        # 初始化分类字典
-        categorized = {cat: [] for cat in self.config.channel_categories}
+        categorized = {cat: [] for cat in self.config.channel_categories}  # TXT按分类组织
+        m3u_lines = ['#EXTM3U x-tvg-url=""\n']  # M3U文件头
+        channel_stats = []  # 报告统计
         
-        # 按分类组织频道
+        # 按模板顺序遍历频道，每个频道只分类一次
         for channel in self.get_ordered_channels(results.keys()):
             streams = results.get(channel, [])
             if not streams:
                 continue
-                
-            matched = False
-            # 匹配频道分类
-            for cat, keywords in self.config.channel_categories.items():
-                if any(keyword in channel for keyword in keywords):
-                    # 添加格式化的频道信息
-                    categorized[cat].extend(
-                        f"{channel},{url} # 速度: {speed:.1f}KB/s" 
-                        for url, speed in streams
-                    )
-                    matched = True
-                    break
             
-            # 未匹配的频道归为其他
-            if not matched:
-                categorized["其他频道,#genre#"].extend(
-                    f"{channel},{url} # 速度: {speed:.1f}KB/s" 
-                    for url, speed in streams
-                )
-        
-        # 写入文件
-        with open(self.config.output_files['txt'], 'w', encoding='utf-8') as f:
-            for cat, items in categorized.items():
-                if items:
-                    f.write(f"\n{cat}\n")  # 分类标题
-                    f.write("\n".join(items) + "\n")  # 频道列表
-        
-        total_streams = sum(len(items) for items in categorized.values())
+            category = self._match_category(channel)  # 频道分类
+            group = self.category_groups[category]  # M3U分组名
+            best_speed = max(speed for _, speed in streams)  # 最佳速度
+            channel_stats.append((channel, best_speed, len(streams)))  # 最佳速度和源数量
+            
+            for url, speed in streams:
+                # TXT格式：频道名,URL # 速度
+                categorized[category].append(f"{channel},{url} # 速度: {speed:.1f}KB/s\n")
+                
+                # M3U格式：EXTINF行 + URL行
+                quality = self.get_speed_quality(speed)  # 速度质量
+                m3u_lines.append(f'#EXTINF:-1 tvg-id="" tvg-name="{channel}" tvg-logo="" group-title="{group}",{channel} [速度: {speed:.1f}KB/s {quality}]\n{url}\n')
+        
+        # 写入TXT文件，整个文件拼接后一次写入
+        txt_parts = []
+        for cat, items in categorized.items():
+            if items:
+                txt_parts.append(f"\n{cat}\n")  # 分类标题
+                txt_parts.extend(items)  # 频道列表
+        # 整个文件只做一次UTF-8编码，也不经过换行符转换
+        self.write_file_atomic(self.config.output_files['txt'], ''.join(txt_parts).encode('utf-8'))
+        
+        total_streams = sum(count for _, _, count in channel_stats)
         self.log(f"生成TXT文件: {self.config.output_files['txt']} (共 {total_streams} 个源)", "SUCCESS")
-
-    def generate_m3u_file(self, results: Dict[str, List[Tuple[str, float]]]):
-        """
-        生成M3U格式文件
         
-        Args:
-            results: 测速结果字典
-        """
-        total_streams = 0
-        
-        with open(self.config.output_files['m3u'], 'w', encoding='utf-8') as f:
-            f.write('#EXTM3U x-tvg-url=""\n')  # M3U文件头
-            
-            # 遍历所有频道
-            for channel in self.get_ordered_channels(results.keys()):
-                streams = results.get(channel, [])
-                for url, speed in streams:
-                    quality = self.get_speed_quality(speed)  # 速度质量
-                    group = self.categorize_channel(channel)  # 频道分类
-                    
-                    # 写入EXTINF行
-                    f.write(f'#EXTINF:-1 tvg-id="" tvg-name="{channel}" tvg-logo="" group-title="{group}",{channel} [速度: {speed:.1f}KB/s {quality}]\n')
-                    f.write(f'{url}\n')  # URL行
-                    total_streams += 1
+        # 写入M3U文件
+        self.write_file_atomic(self.config.output_files['m3u'], ''.join(m3u_lines).encode('utf-8'))
         
         self.log(f"生成M3U文件: {self.config.output_files['m3u']} (共 {total_streams} 个源)", "SUCCESS")
+        
+        return channel_stats
 
     def generate_json_file(self, results: Dict[str, List[Tuple[str, float]]]):
         """
@@ -789,51 +1338,47 @@ class IPTVTool:
         # 填充频道数据
         for channel, streams in results.items():
             data["channels"][channel] = {
-                "best_speed": streams[0][1] if streams else 0,  # 最佳速度
+                "best_speed": max((speed for _, speed in streams), default=0),  # 最佳速度
                 "stream_count": len(streams),  # 源数量
                 "streams": [
                     {
                         "url": url,
                         "speed": speed,
                         "quality": self.get_speed_quality(speed),  # 质量评级
-                        "domain": self._extract_domain(url)  # 域名
+                        "domain": _extract_domain(url)  # 域名
                     }
                     for url, speed in streams
                 ],
                 "category": self.categorize_channel(channel)  # 分类
             }
         
-        # 写入JSON文件
-        with open(self.config.output_files['json'], 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)  # 美化输出
+        # 写入JSON文件，先序列化为字符串再一次写入（json.dump会逐个片段调用write）
+        self.write_file_atomic(
+            self.config.output_files['json'],
+            json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')  # 美化输出
+        )
         
         self.log(f"生成JSON文件: {self.config.output_files['json']}", "SUCCESS")
 
-    def generate_report(self, results: Dict[str, List[Tuple[str, float]]]):
+    def generate_report(self, channel_stats: List[Tuple[str, float, int]]):
         """
         生成详细测速报告
         
         Args:
-            results: 测速结果字典
+            channel_stats: 生成播放列表时收集的(频道名称, 最佳速度, 源数量)列表
         """
-        speed_stats = []  # 速度统计
-        valid_channels = []  # 有效频道列表
-        
-        # 收集统计信息
-        for channel, streams in results.items():
-            if streams:
-                best_speed = streams[0][1]  # 每个频道的最佳速度
-                speed_stats.append(best_speed)
-                valid_channels.append((channel, best_speed, len(streams)))
+        valid_channels = channel_stats  # 有效频道列表
+        speed_stats = [speed for _, speed, _ in valid_channels]  # 每个频道的最佳速度
         
         # 检查是否有有效数据
         if not speed_stats:
             self.log("无有效测速结果，跳过报告生成", "WARNING")
             return
         
-        # 按速度排序频道（降序）
-        valid_channels.sort(key=lambda x: x[1], reverse=True)
-        
+        # 速度最快的前20个频道（降序）
+        top_channels = heapq.nlargest(20, valid_channels, key=operator.itemgetter(1))
+        sorted_speeds = sorted(speed_stats)  # 升序速度，中位数和区间统计共用
+
         # 生成报告内容
         report_lines = [
             "="*60,
@@ -845,7 +1390,7 @@ class IPTVTool:
             f"平均速度: {sum(speed_stats)/len(speed_stats):.1f} KB/s",
             f"最快速度: {max(speed_stats):.1f} KB/s",
             f"最慢速度: {min(speed_stats):.1f} KB/s",
-            f"速度中位数: {sorted(speed_stats)[len(speed_stats)//2]:.1f} KB/s",
+            f"速度中位数: {sorted_speeds[len(sorted_speeds)//2]:.1f} KB/s",
             "\n速度分布:",
         ]
         
@@ -860,15 +1405,17 @@ class IPTVTool:
         ]
         
         range_counts = {}
-        total = len(speed_stats)
-        
-        # 计算每个速度区间的频道数量
+        total = len(sorted_speeds)
+        upper = total  # 速度不高于上一区间下限的频道数
+
+        # 在有序速度上二分定位区间边界，计算每个速度区间的频道数量
         for i, (min_speed, range_name) in enumerate(speed_ranges):
-            if i == len(speed_ranges) - 1:  # 最后一个区间
-                count = len([s for s in speed_stats if s <= min_speed])
+            if i == len(speed_ranges) - 1:  # 最后一个区间收纳剩余频道
+                lower = 0
             else:
-                next_min = speed_ranges[i+1][0]
-                count = len([s for s in speed_stats if min_speed < s <= next_min])
+                lower = bisect.bisect_right(sorted_speeds, min_speed)
+            count = upper - lower
+            upper = lower
             range_counts[range_name] = count
             percentage = count / total * 100  # 百分比
             report_lines.append(f"  {range_name:<15} KB/s: {count:>3}个频道 ({percentage:5.1f}%)")
@@ -876,7 +1423,7 @@ class IPTVTool:
         # 添加TOP 20频道排名
         report_lines.extend(["\n频道速度排名 TOP 20:", "-"*50])
         
-        for i, (channel, speed, count) in enumerate(valid_channels[:20], 1):
+        for i, (channel, speed, count) in enumerate(top_channels, 1):
             quality = self.get_speed_quality(speed)
             report_lines.append(f"{i:2d}. {channel:<20} {speed:6.1f} KB/s ({quality:>4}, {count}个源)")
         
@@ -887,8 +1434,7 @@ class IPTVTool:
         report_content = "\n".join(report_lines)
         
         # 写入报告文件
-        with open(self.config.output_files['report'], 'w', encoding='utf-8') as f:
-            f.write(report_content + "\n")
+        self.write_file_atomic(self.config.output_files['report'], (report_content + "\n").encode('utf-8'))
         
         self.log(f"生成测速报告: {self.config.output_files['report']}", "SUCCESS")
         
@@ -897,6 +1443,25 @@ class IPTVTool:
 
     # ==================== 辅助方法 ====================
     
+    def write_file_atomic(self, path: Path, data: bytes):
+        """
+        原子写入文件：先写入同目录的临时文件并落盘，再替换目标文件，中途失败不会留下残缺文件
+        
+        Args:
+            path: 目标文件路径
+            data: 要写入的内容
+        """
+        tmp_path = path.with_name(path.name + '.tmp')
+        try:
+            with open(tmp_path, 'wb', buffering=1 << 20) as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())  # 确保内容落盘后再替换
+            os.replace(tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)  # 清理临时文件
+            raise
+    
     def get_ordered_channels(self, channels: List[str]) -> List[str]:
         """
         按照模板顺序排序频道列表
@@ -911,55 +1476,49 @@ class IPTVTool:
         if not self.valid_channels:
             return sorted(channels)
         
-        ordered = []
-        # 首先添加模板中的频道（按模板顺序）
-        if self.config.template_file.exists():
-            with open(self.config.template_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#'):
-                        if match := self.channel_pattern.match(line):
-                            channel = match.group(1).strip()
-                            if channel in channels and channel not in ordered:
-                                ordered.append(channel)
+        channel_set = set(channels)
+        
+        # 首先添加模板中的频道（按加载时缓存的模板顺序）
+        ordered = [ch for ch in self.template_order if ch in channel_set]
         
         # 添加未在模板中的频道（按字母顺序）
-        remaining_channels = [ch for ch in channels if ch not in ordered]
-        ordered.extend(sorted(remaining_channels))
-                
+        ordered.extend(sorted(channel_set - self.valid_channels))
+        
         return ordered
 
-    def _extract_domain(self, url: str) -> str:
+    def categorize_channel(self, channel: str) -> str:
         """
-        从URL提取域名
+        根据频道名称分类
         
         Args:
-            url: 完整URL
+            channel: 频道名称
             
         Returns:
-            str: 域名或截断的URL
+            str: 分类名称
         """
-        try:
-            netloc = urlparse(url).netloc  # 解析网络位置
-            return netloc.split(':')[0]  # 移除端口号
-        except:
-            # 解析失败时返回截断的URL
-            return url[:25] + "..." if len(url) > 25 else url
+        return self.category_groups[self._match_category(channel)]  # 不含格式后缀的分类名
 
-    def categorize_channel(self, channel: str) -> str:
+    def _match_category(self, channel: str) -> str:
         """
-        根据频道名称分类
+        匹配频道所属的分类配置项
         
         Args:
             channel: 频道名称
             
         Returns:
-            str: 分类名称
+            str: 分类配置键（含",#genre#"后缀）
         """
-        for category, keywords in self.config.channel_categories.items():
-            if any(keyword in channel for keyword in keywords):
-                return category.replace(",#genre#", "")  # 移除格式后缀
-        return "其他频道"  # 默认分类
+        if channel in self.category_cache:
+            return self.category_cache[channel]
+        
+        matched = "其他频道,#genre#"  # 默认分类
+        for category, pattern in self.category_patterns:
+            if pattern.search(channel):
+                matched = category
+                break
+        
+        self.category_cache[channel] = matched
+        return matched
 
     def get_speed_quality(self, speed: float) -> str:
         """
@@ -994,7 +1553,7 @@ class IPTVTool:
         self.log(f"   超时时间: {self.config.timeout}s")
         self.log(f"   并发线程: {self.config.max_workers}")
         self.log(f"   测速数据: {self.config.test_size_kb}KB")
-        self.log(f"   重试次数: {self.config.retry_times}")
+        self.log(f"   重试次数: 抓取{self.config.retry_times}次 / 测速{self.config.probe_retry_times}次")
         self.log(f"   数据源数: {len(self.config.source_urls)}")
         
         # 显示模板信息
@@ -1006,17 +1565,17 @@ class IPTVTool:
         try:
             # 阶段1: 抓取直播源
             self.log("\n🚀 阶段1: 抓取直播源...")
-            if content := self.fetch_streams():
+            if contents := self.fetch_streams():
                 
                 # 阶段2: 解析直播源数据
                 self.log("\n🔍 阶段2: 解析直播源数据...")
-                df = self.parse_content(content)
+                streams = self.parse_content(contents)
                 
                 # 显示频道匹配情况
-                matched_channels = set(df['program_name'].unique())
+                matched_channels = {s[0] for s in streams}
                 self.log(f"\n📊 频道匹配结果:")
                 self.log(f"   发现频道总数: {len(matched_channels)}")
-                self.log(f"   直播源总数: {len(df)}")
+                self.log(f"   直播源总数: {len(streams)}")
                 
                 # 模板匹配统计
                 if self.valid_channels:
@@ -1028,7 +1587,7 @@ class IPTVTool:
                         self.log(f"   未匹配模板频道: {len(unmatched)}个", "WARNING")
                 
                 # 整理和组织数据
-                grouped = self.organize_streams(df)
+                grouped = self.organize_streams(streams)
                 self.log(f"\n📋 整理后: {len(grouped)}个频道")
                 
                 # 阶段3: 测速和优化
@@ -1049,6 +1608,7 @@ class IPTVTool:
                 self.log(f"   📺 总直播源: {total_streams}个") 
                 self.log(f"   ⏰ 总耗时: {elapsed_time:.1f}秒")
                 self.log(f"   💾 输出文件:")
+                self.flush_logging()  # 先写出日志，使下面显示的日志文件大小是当前大小
                 # 显示所有输出文件信息
                 for file_type, file_path in self.config.output_files.items():
                     if file_path.exists():
@@ -1064,13 +1624,15 @@ class IPTVTool:
             self.log(f"❌ 处理过程中发生错误: {str(e)}", "ERROR")
             import traceback
             self.log(traceback.format_exc(), "ERROR")  # 记录完整堆栈跟踪
+        finally:
+            self.flush_logging()  # 确保队列和缓冲中的日志全部写入文件
 
 def main():
     """主函数 - 程序入口点"""
     # 创建命令行参数解析器
     parser = argparse.ArgumentParser(description='IPTV直播源抓取与测速工具')
     parser.add_argument('--timeout', type=int, default=8, help='请求超时时间(秒)')
-    parser.add_argument('--workers', type=int, default=4, help='并发线程数')
+    parser.add_argument('--workers', type=int, default=16, help='并发线程数')
     parser.add_argument('--test-size', type=int, default=128, help='测速数据大小(KB)')
     parser.add_argument('--retry', type=int, default=2, help='重试次数')
     parser.add_argument('--template', type=str, help='模板文件路径')
@@ -1093,9 +1655,11 @@ def main():
         # 处理自定义输出目录
         if args.output_dir:
             config.base_dir = Path(args.output_dir)
-            # 更新所有输出文件路径
+            # 更新所有输出文件和缓存文件路径
             for key in config.output_files:
                 config.output_files[key] = config.base_dir / config.output_files[key].name
+            for attr in ('cache_file', 'http_cache_file', 'dns_cache_file'):
+                setattr(config, attr, config.base_dir / getattr(config, attr).name)
         
         # 创建并运行工具
         tool = IPTVTool(config)